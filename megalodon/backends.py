@@ -18,8 +18,9 @@ PYGUPPY_NAME = 'pyguppy'
 # parameters for each backend run mode
 TAI_PARAMS = namedtuple('TAI_PARAMS', (
     'available', 'taiyaki_model_fn', 'devices', 'chunk_size',
-    'chunk_overlap', 'max_concur_chunks'))
-TAI_PARAMS.__new__.__defaults__ = tuple([None, ] * 5)
+    'chunk_overlap', 'max_concur_chunks', 'max_batch_reads',
+    'fp16_transfer'))
+TAI_PARAMS.__new__.__defaults__ = tuple([None, ] * 7)
 FAST5_PARAMS = namedtuple('FAST5_PARAMS', (
     'available', 'fast5s_dir', 'num_startup_reads'))
 FAST5_PARAMS.__new__.__defaults__ = tuple([None, ] * 2)
@@ -48,9 +49,9 @@ MAX_DEVICE_WAIT = 1.0
 
 SIGNAL_DATA = namedtuple('SIGNAL_DATA', (
     'fast5_fn', 'read_id', 'raw_len', 'dacs', 'raw_signal',
-    'scale_params', 'stride', 'posteriors'))
+    'scale_params', 'stride', 'posteriors', 'trans_weights'))
 # set default value of None for ref, alts and ref_start
-SIGNAL_DATA.__new__.__defaults__ = tuple([None, ] * 5)
+SIGNAL_DATA.__new__.__defaults__ = tuple([None, ] * 6)
 
 LOGGER = logging.get_logger()
 
@@ -81,7 +82,9 @@ def parse_backend_params(args, num_fast5_startup_reads=5):
                 args.max_concurrent_chunks)):
             tai_params = TAI_PARAMS(
                 True, tai_model_fn, args.devices, args.chunk_size,
-                args.chunk_overlap, args.max_concurrent_chunks)
+                args.chunk_overlap, args.max_concurrent_chunks,
+                getattr(args, 'max_batch_reads', 1),
+                getattr(args, 'fp16_transfer', False))
         else:
             tai_params = TAI_PARAMS(False)
 
@@ -126,31 +129,28 @@ def _log_softmax_axis1(x):
 class ModelInfo(object):
     def compute_mod_alphabet_attrs(self):
         # parse these values to more user-friendly data structures
-        self.can_alphabet = ''
-        self.can_indices = []
-        self.mod_long_names = []
-        self.str_to_int_mod_labels = {}
+        # output alphabet is laid out as each canonical base followed by its
+        # modified bases
+        self.can_indices = np.cumsum(np.concatenate(
+            [[0], np.asarray(self.can_nmods) + 1])).astype(np.uintp)
+        alphabet_len = int(self.can_indices[-1])
+        is_can = np.zeros(alphabet_len, dtype=bool)
+        is_can[self.can_indices[:-1]] = True
+        # index of the closest preceding canonical base for each position
+        curr_can_idx = np.where(is_can, np.arange(alphabet_len), -1)
+        np.maximum.accumulate(curr_can_idx, out=curr_can_idx)
+
+        self.can_alphabet = ''.join(
+            self.output_alphabet[can_i] for can_i in self.can_indices[:-1])
+        mod_idxs = np.flatnonzero(~is_can)
+        mod_bases = [self.output_alphabet[mod_i] for mod_i in mod_idxs]
+        self.mod_long_names = list(zip(
+            mod_bases, self.ordered_mod_long_names[:len(mod_bases)]))
+        self.str_to_int_mod_labels = dict(zip(
+            mod_bases, (mod_idxs - curr_can_idx[mod_idxs]).tolist()))
         self.can_base_mods = defaultdict(list)
-        curr_can_offset = 0
-        curr_nmods = 0
-        for can_base_nmods in self.can_nmods:
-            can_base = self.output_alphabet[curr_can_offset]
-            self.can_alphabet += can_base
-            self.can_indices.append(curr_can_offset)
-            for mod_i, mod_base in enumerate(self.output_alphabet[
-                    curr_can_offset + 1:
-                    curr_can_offset + can_base_nmods + 1]):
-                self.mod_long_names.append((
-                    mod_base, self.ordered_mod_long_names[
-                        curr_nmods + mod_i]))
-                self.str_to_int_mod_labels[mod_base] = mod_i + 1
-                self.can_base_mods[can_base].append(mod_base)
-
-            curr_can_offset += can_base_nmods + 1
-            curr_nmods += can_base_nmods
-
-        self.can_indices.append(curr_can_offset)
-        self.can_indices = np.array(self.can_indices).astype(np.uintp)
+        for mod_base, can_i in zip(mod_bases, curr_can_idx[mod_idxs]):
+            self.can_base_mods[self.output_alphabet[can_i]].append(mod_base)
         self.can_base_mods = dict(self.can_base_mods)
 
     def _load_taiyaki_model(self):
@@ -160,16 +160,18 @@ class ModelInfo(object):
         devices = self.params.taiyaki.devices
         if devices is None:
             devices = ['cpu', ]
+        # assign processes to devices round robin
         self.process_devices = [
-            parse_device(devices[i]) for i in np.tile(
-                np.arange(len(devices)),
-                (self.num_proc // len(devices)) + 1)][:self.num_proc]
+            parse_device(devices[proc_i % len(devices)])
+            for proc_i in range(self.num_proc)]
 
         try:
             # import modules
             from taiyaki.helpers import (
                 load_model as load_taiyaki_model, guess_model_stride)
-            from taiyaki.basecall_helpers import run_model as tai_run_model
+            from taiyaki.basecall_helpers import (
+                chunk_read as tai_chunk_read,
+                stitch_chunks as tai_stitch_chunks)
             from taiyaki.layers import GlobalNormFlipFlopCatMod
         except ImportError:
             LOGGER.error(
@@ -185,17 +187,19 @@ class ModelInfo(object):
             sys.exit(1)
 
         # store modules in object
-        self.load_taiyaki_model = load_taiyaki_model
-        self.tai_run_model = tai_run_model
+        self.tai_chunk_read = tai_chunk_read
+        self.tai_stitch_chunks = tai_stitch_chunks
         self.torch = torch
 
-        tmp_model = self.load_taiyaki_model(
-            self.params.taiyaki.taiyaki_model_fn)
-        ff_layer = tmp_model.sublayers[-1]
+        # load model once here and place weights in shared memory so read
+        # workers do not each re-load the model from disk
+        self.model = load_taiyaki_model(
+            self.params.taiyaki.taiyaki_model_fn).share_memory()
+        ff_layer = self.model.sublayers[-1]
         self.is_cat_mod = (
             GlobalNormFlipFlopCatMod is not None and isinstance(
                 ff_layer, GlobalNormFlipFlopCatMod))
-        self.stride = guess_model_stride(tmp_model)
+        self.stride = guess_model_stride(self.model)
         self.output_size = ff_layer.size
         if self.is_cat_mod:
             # Modified base model is defined by 3 fixed fields in taiyaki
@@ -413,21 +417,33 @@ class ModelInfo(object):
         ncan_base = len(self.can_alphabet)
         return (ncan_base + ncan_base) * (ncan_base + 1)
 
+    @property
+    def max_batch_reads(self):
+        if self.model_type == TAI_NAME and \
+           self.params.taiyaki.max_batch_reads is not None:
+            return max(1, self.params.taiyaki.max_batch_reads)
+        return 1
+
     def prep_model_worker(self, device):
         """ Load model onto a newly spawned process
         """
         if self.model_type == TAI_NAME:
-            # setup for taiyaki model
-            self.model = self.load_taiyaki_model(
-                self.params.taiyaki.taiyaki_model_fn)
+            # setup for taiyaki model (model loaded in main process)
             if device is None or device == 'cpu':
                 self.device = self.torch.device('cpu')
+                self.is_gpu = False
             else:
                 sleep(np.random.uniform(0, MAX_DEVICE_WAIT))
                 try:
                     self.device = self.torch.device(device)
                     self.torch.cuda.set_device(self.device)
                     self.model = self.model.to(self.device)
+                    self.is_gpu = True
+                    # pinned staging buffer (allocated/grown on demand) and
+                    # stream for asynchronous host to device chunk copies
+                    self.pinned_chunks = None
+                    self.h2d_stream = self.torch.cuda.Stream(self.device)
+                    self.h2d_event = self.torch.cuda.Event()
                 except RuntimeError:
                     LOGGER.error('Invalid CUDA device: {}'.format(device))
                     raise mh.MegaError('Error setting CUDA GPU device.')
@@ -443,8 +459,12 @@ class ModelInfo(object):
 
         return
 
-    def extract_signal_info(self, fast5_fn, read_id, extract_dacs=False):
-        read = fast5_io.get_read(fast5_fn, read_id)
+    def extract_signal_info(
+            self, fast5_fn, read_id, extract_dacs=False, fast5_cache=None):
+        if fast5_cache is None:
+            read = fast5_io.get_read(fast5_fn, read_id)
+        else:
+            read = fast5_cache.get_read(fast5_fn, read_id)
         dacs = scale_params = raw_sig = None
         if extract_dacs:
             # if not processing signal mappings, don't save dacs
@@ -452,7 +472,7 @@ class ModelInfo(object):
             # scale parameters and trimming computed by guppy
             if not self.model_type == PYGUPPY_NAME:
                 scale_params = mh.med_mad(dacs)
-                raw_sig = (dacs - scale_params[0]) / scale_params[1]
+                raw_sig = mh.scale_signal(dacs, scale_params)
 
         if self.model_type == TAI_NAME:
             if raw_sig is None:
@@ -481,29 +501,176 @@ class ModelInfo(object):
         raise mh.MegaError('Invalid model type')
 
     def run_taiyaki_model(self, raw_sig, n_can_state=None):
+        return self.run_taiyaki_model_batch([raw_sig, ], n_can_state)[0]
+
+    def _chunks_to_device(self, chunks):
+        """ Copy chunks (numpy array) to the model device. On GPU, chunks are
+        staged in page-locked memory and copied on a separate stream, so a
+        copy issued after queuing a forward pass overlaps that forward pass.
+        """
+        chunks = self.torch.from_numpy(chunks)
+        if not self.is_gpu:
+            return chunks
+        # wait for previous copy out of the staging buffer to complete
+        self.h2d_event.synchronize()
+        if self.pinned_chunks is None or \
+           self.pinned_chunks.shape[0] < chunks.numel():
+            self.pinned_chunks = self.torch.empty(
+                chunks.numel(), dtype=chunks.dtype, pin_memory=True)
+        staged_chunks = self.pinned_chunks[:chunks.numel()].view(
+            chunks.shape)
+        staged_chunks.copy_(chunks)
+        with self.torch.cuda.stream(self.h2d_stream):
+            dev_chunks = staged_chunks.to(self.device, non_blocking=True)
+            self.h2d_event.record()
+        compute_stream = self.torch.cuda.current_stream(self.device)
+        compute_stream.wait_event(self.h2d_event)
+        # allocated on the copy stream, but consumed on the compute stream
+        dev_chunks.record_stream(compute_stream)
+        return dev_chunks
+
+    def _run_taiyaki_chunks(self, dev_chunks):
+        """ Run chunks (time x batch x 1) on the model device through the
+        taiyaki model, processing at most max_concur_chunks in each forward
+        pass.
+        """
+        try:
+            with self.torch.no_grad():
+                return self.torch.cat([
+                    self.model(some_chunks)
+                    for some_chunks in self.torch.split(
+                        dev_chunks, self.params.taiyaki.max_concur_chunks,
+                        1)], 1)
+        except AttributeError:
+            raise mh.MegaError('Out of date or incompatible model')
+
+    def _stitch_taiyaki_read_group(
+            self, reads_chunks, packed_out, n_can_state):
+        """ Stitch each read's output from the packed network output for a
+        group of reads and transfer it to the host.
+        """
+        cu_chunks = np.cumsum([0, ] + [
+            chunks.shape[1] for chunks, _, _ in reads_chunks])
+        if n_can_state is None:
+            packed_slabs = (packed_out, )
+        else:
+            # split canonical and modified base outputs into separate
+            # contiguous slabs on the model device (once per group) so
+            # per-read stitching and transfer scan contiguous rows
+            packed_slabs = (
+                packed_out[:, :, :n_can_state].contiguous(),
+                packed_out[:, :, n_can_state:].contiguous())
+        if self.params.taiyaki.fp16_transfer and self.is_gpu:
+            # halve device to host transfer size (converted back to
+            # float32 on the host)
+            packed_slabs = tuple(
+                packed_slab.half() for packed_slab in packed_slabs)
+
+        group_trans_weights = []
+        for (_, chunk_starts, chunk_ends), chunks_start, chunks_end in zip(
+                reads_chunks, cu_chunks[:-1], cu_chunks[1:]):
+            r_slabs = [self.tai_stitch_chunks(
+                packed_slab[:, chunks_start:chunks_end], chunk_starts,
+                chunk_ends, self.stride) for packed_slab in packed_slabs]
+            trans_weights = tuple(
+                r_slab.contiguous().cpu().float().numpy()
+                for r_slab in r_slabs)
+            if n_can_state is None:
+                trans_weights = trans_weights[0]
+            group_trans_weights.append(trans_weights)
+
+        return group_trans_weights
+
+    def run_taiyaki_model_batch(self, raw_sigs, n_can_state=None):
+        """ Run taiyaki model over several reads at once.
+
+        Chunks from reads of the same chunk length are packed along the batch
+        dimension (with cumulative chunk counts marking read boundaries) so
+        that forward passes are shared across reads without padding. Reads
+        shorter than chunk_size produce a single shorter chunk and are packed
+        with other reads of the same length. Groups are limited to
+        max_concur_chunks total chunks (or a single read with more chunks)
+        so network output held on the device is capped as for single reads.
+
+        On GPU, chunks for the next group are copied to the device while the
+        forward pass, stitching and host transfer for the current group run.
+
+        :returns: List of trans_weights (as from run_taiyaki_model) for each
+            signal in raw_sigs.
+        """
         if self.model_type != TAI_NAME:
             raise mh.MegaError(
                 'Attempted to run taiyaki model with non-taiyaki ' +
                 'initialization.')
+        max_group_chunks = self.params.taiyaki.max_concur_chunks
+        batch_trans_weights = [None, ] * len(raw_sigs)
         try:
-            trans_weights = self.tai_run_model(
-                raw_sig, self.model, self.params.taiyaki.chunk_size,
-                self.params.taiyaki.chunk_overlap,
-                self.params.taiyaki.max_concur_chunks)
-        except AttributeError:
-            raise mh.MegaError('Out of date or incompatible model')
+            reads_chunks = [self.tai_chunk_read(
+                raw_sig, self.params.taiyaki.chunk_size,
+                self.params.taiyaki.chunk_overlap) for raw_sig in raw_sigs]
+            # group reads by chunk length, starting a new group for a chunk
+            # length when adding a read would exceed max_group_chunks
+            read_groups = []
+            open_groups = {}
+            for read_i, (chunks, _, _) in enumerate(reads_chunks):
+                group = open_groups.get(chunks.shape[0])
+                if group is None or \
+                   group[0] + chunks.shape[1] > max_group_chunks:
+                    group = open_groups[chunks.shape[0]] = [0, []]
+                    read_groups.append(group[1])
+                group[0] += chunks.shape[1]
+                group[1].append(read_i)
+            groups_chunks = [
+                [reads_chunks[read_i] for read_i in read_idxs]
+                for read_idxs in read_groups]
+
+            dev_chunks = self._chunks_to_device(np.concatenate([
+                chunks for chunks, _, _ in groups_chunks[0]], axis=1))
+            for group_i, read_idxs in enumerate(read_groups):
+                packed_out = self._run_taiyaki_chunks(dev_chunks)
+                # forward pass is queued asynchronously on GPU, so copy the
+                # next group's chunks now to overlap this group's forward
+                # pass, stitching and host transfer
+                dev_chunks = None if group_i + 1 == len(read_groups) else \
+                    self._chunks_to_device(np.concatenate([
+                        chunks for chunks, _, _ in groups_chunks[
+                            group_i + 1]], axis=1))
+                group_trans_weights = self._stitch_taiyaki_read_group(
+                    groups_chunks[group_i], packed_out, n_can_state)
+                # release this group's output before the next forward pass
+                del packed_out
+                for read_i, trans_weights in zip(
+                        read_idxs, group_trans_weights):
+                    batch_trans_weights[read_i] = trans_weights
         except RuntimeError as e:
             LOGGER.debug('Likely out of memory error: {}'.format(str(e)))
             raise mh.MegaError(
                 'Likely out of memory error. See log for details.')
-        if self.device != self.torch.device('cpu'):
-            self.torch.cuda.empty_cache()
-        if n_can_state is not None:
-            trans_weights = (
-                np.ascontiguousarray(trans_weights[:, :n_can_state]),
-                np.ascontiguousarray(trans_weights[:, n_can_state:]))
 
-        return trans_weights
+        return batch_trans_weights
+
+    def run_model_batch(self, sig_infos):
+        """ Run neural network over a batch of reads (taiyaki backend only).
+
+        :returns: sig_infos with trans_weights populated. If the batch fails
+            (e.g. out of GPU memory), sig_infos are returned unchanged and
+            each read is run individually within basecall_read.
+        """
+        if self.model_type != TAI_NAME or len(sig_infos) < 2:
+            return sig_infos
+        try:
+            batch_trans_weights = self.run_taiyaki_model_batch(
+                [sig_info.raw_signal for sig_info in sig_infos],
+                self.n_can_state if self.is_cat_mod else None)
+        except Exception as e:
+            # fall back to running reads individually so per-read errors are
+            # reported as usual
+            LOGGER.debug('Batch of {} reads failed: {}'.format(
+                len(sig_infos), str(e)))
+            return sig_infos
+        return [sig_info._replace(trans_weights=trans_weights)
+                for sig_info, trans_weights in zip(
+                    sig_infos, batch_trans_weights)]
 
     def _softmax_mod_weights(self, raw_mod_weights):
         mod_layers = []
@@ -565,8 +732,7 @@ class ModelInfo(object):
                 called_read.scaling['med_abs_dev'] * mh.MED_NORM_FACTOR)
             sig_info = sig_info._replace(
                 raw_len=trimmed_dacs.shape[0], dacs=trimmed_dacs,
-                raw_signal=((trimmed_dacs - scale_params[0]) /
-                            scale_params[1]).astype(np.float32),
+                raw_signal=mh.scale_signal(trimmed_dacs, scale_params),
                 scale_params=scale_params)
 
         return (called_read.seq, called_read.qual, rl_cumsum, can_post,
@@ -587,12 +753,19 @@ class ModelInfo(object):
 
         post_w_mods = mod_weights = None
         if self.model_type == TAI_NAME:
-            # run neural network with taiyaki
+            # run neural network with taiyaki (unless already run over a
+            # batch of reads)
+            trans_weights = sig_info.trans_weights
+            if trans_weights is None:
+                trans_weights = self.run_taiyaki_model(
+                    sig_info.raw_signal,
+                    self.n_can_state if self.is_cat_mod else None)
+            else:
+                sig_info = sig_info._replace(trans_weights=None)
             if self.is_cat_mod:
-                bc_weights, mod_weights = self.run_taiyaki_model(
-                    sig_info.raw_signal, self.n_can_state)
+                bc_weights, mod_weights = trans_weights
             else:
-                bc_weights = self.run_taiyaki_model(sig_info.raw_signal)
+                bc_weights = trans_weights
             # perform forward-backward algorithm on neural net output
             can_post = decode.crf_flipflop_trans_post(bc_weights, log=True)
             if return_post_w_mods and self.is_cat_mod:
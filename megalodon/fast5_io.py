@@ -47,6 +47,30 @@ def get_read(fast5_fn, read_id):
     return get_fast5_file(fast5_fn, mode="r").get_read(read_id)
 
 
+class Fast5FileCache(object):
+    """ Keep the most recently accessed fast5 file open, as reads are
+    generally queued in file order, so multi-read files are not re-opened
+    for each read.
+
+    Not thread safe. Each instance should be owned by a single thread and
+    reads returned from get_read should be consumed before the next call.
+    """
+    def __init__(self):
+        self.fast5_fn = self.fast5_fp = None
+
+    def get_read(self, fast5_fn, read_id):
+        if fast5_fn != self.fast5_fn:
+            self.close()
+            self.fast5_fp = get_fast5_file(fast5_fn, mode="r")
+            self.fast5_fn = fast5_fn
+        return self.fast5_fp.get_read(read_id)
+
+    def close(self):
+        if self.fast5_fp is not None:
+            self.fast5_fp.close()
+        self.fast5_fn = self.fast5_fp = None
+
+
 def get_signal(read, scale=True):
     """ Get raw signal from read.
     """
@@ -57,8 +81,7 @@ def get_signal(read, scale=True):
                            'installed (if applicable).')
 
     if scale:
-        med, mad = mh.med_mad(raw_sig)
-        raw_sig = ((raw_sig - med) / mad).astype(np.float32)
+        raw_sig = mh.scale_signal(raw_sig, mh.med_mad(raw_sig))
 
     return raw_sig
 
@@ -220,6 +220,58 @@ def _get_bc_queue(
     return
 
 
+def _extract_signal_info(
+        model_info, fast5_fn, read_id, extract_dacs, failed_reads_q,
+        fast5_cache):
+    """ Extract signal for a read, reporting any failure to failed_reads_q
+    and returning None.
+    """
+    try:
+        return model_info.extract_signal_info(
+            fast5_fn, read_id, extract_dacs, fast5_cache)
+    except mh.MegaError as e:
+        failed_reads_q.put((
+            True, True, str(e), fast5_fn + ':::' + read_id, None, 0))
+        LOGGER.debug('Incomplete processing for read {} ::: {}'.format(
+            read_id, str(e)))
+    except Exception:
+        failed_reads_q.put((
+            True, True, _UNEXPECTED_ERROR_CODE, fast5_fn + ':::' + read_id,
+            traceback.format_exc(), 0))
+        LOGGER.debug('Unexpected error for read {}'.format(read_id))
+    return None
+
+
+def _prefetch_reads_worker(
+        read_file_q, sig_info_q, model_info, extract_dacs, failed_reads_q):
+    """ Extract signal for queued reads, passing successfully extracted
+    reads to sig_info_q (ending with None once the input is exhausted).
+
+    Fast5 files are opened through a cache owned by this thread and closed
+    on exit.
+    """
+    fast5_cache = fast5_io.Fast5FileCache()
+    try:
+        while True:
+            try:
+                fast5_fn, read_id = read_file_q.get(block=False)
+            except queue.Empty:
+                sleep(0.001)
+                continue
+            if fast5_fn is None:
+                sig_info_q.put(None)
+                break
+            sig_info = _extract_signal_info(
+                model_info, fast5_fn, read_id, extract_dacs, failed_reads_q,
+                fast5_cache)
+            if sig_info is not None:
+                sig_info_q.put(sig_info)
+    finally:
+        fast5_cache.close()
+
+    return
+
+
 def _process_reads_worker(
         read_file_q, bc_q, vars_q, failed_reads_q, mods_q, caller_conn,
         sig_map_q, ref_out_info, model_info, vars_data, mods_info, device):
@@ -228,7 +280,6 @@ def _process_reads_worker(
         model_info.prep_model_worker(device)
         vars_data.reopen_variant_index()
         LOGGER.debug('Starting read worker {}'.format(mp.current_process()))
-        sig_info = None
     except Exception:
         if caller_conn is not None:
             caller_conn.send(True)
@@ -237,46 +288,71 @@ def _process_reads_worker(
                           mp.current_process(), traceback.format_exc()))
         return
 
+    # extract signal for upcoming reads in a background thread so that fast5
+    # I/O overlaps basecalling of the current batch of reads
+    sig_info_q = queue.Queue(maxsize=2 * model_info.max_batch_reads)
+    prefetch_t = threading.Thread(
+        target=_prefetch_reads_worker, args=(
+            read_file_q, sig_info_q, model_info, sig_map_q is not None,
+            failed_reads_q), daemon=True)
+    prefetch_t.start()
+
     while True:
         try:
-            try:
-                fast5_fn, read_id = read_file_q.get(block=False)
-            except queue.Empty:
-                sleep(0.001)
-                continue
-
-            if fast5_fn is None:
-                if caller_conn is not None:
-                    caller_conn.send(True)
-                LOGGER.debug('Gracefully exiting read worker {}'.format(
-                    mp.current_process()))
-                break
-            LOGGER.debug('Analyzing read {}'.format(read_id))
-            sig_info = model_info.extract_signal_info(
-                fast5_fn, read_id, sig_map_q is not None)
-            process_read(
-                sig_info, model_info, bc_q, caller_conn, sig_map_q,
-                ref_out_info, vars_data, vars_q, mods_q, mods_info,
-                failed_reads_q)
-            failed_reads_q.put((
-                False, True, None, None, None, sig_info.raw_len))
-            LOGGER.debug('Successfully processed read {}'.format(read_id))
+            sig_infos = [sig_info_q.get()]
+            # gather any further extracted reads (up to max_batch_reads) so
+            # the neural network can be run over a batch of reads
+            while sig_infos[-1] is not None and \
+                    len(sig_infos) < model_info.max_batch_reads:
+                try:
+                    sig_infos.append(sig_info_q.get(block=False))
+                except queue.Empty:
+                    break
+            do_exit = sig_infos[-1] is None
+            if do_exit:
+                sig_infos.pop()
+            sig_infos = model_info.run_model_batch(sig_infos)
         except KeyboardInterrupt:
             failed_reads_q.put((
-                True, True, 'Keyboard interrupt', fast5_fn, None, 0))
-            LOGGER.debug('Keyboard interrupt during read {}'.format(read_id))
+                True, True, 'Keyboard interrupt', None, None, 0))
+            LOGGER.debug('Keyboard interrupt during read batch')
             return
-        except mh.MegaError as e:
-            raw_len = sig_info.raw_len if hasattr(sig_info, 'raw_len') else 0
-            failed_reads_q.put((
-                True, True, str(e), fast5_fn + ':::' + read_id, None, raw_len))
-            LOGGER.debug('Incomplete processing for read {} ::: {}'.format(
-                read_id, str(e)))
-        except Exception:
-            failed_reads_q.put((
-                True, True, _UNEXPECTED_ERROR_CODE, fast5_fn + ':::' + read_id,
-                traceback.format_exc(), 0))
-            LOGGER.debug('Unexpected error for read {}'.format(read_id))
+
+        for sig_info in sig_infos:
+            fast5_fn, read_id = sig_info.fast5_fn, sig_info.read_id
+            try:
+                LOGGER.debug('Analyzing read {}'.format(read_id))
+                process_read(
+                    sig_info, model_info, bc_q, caller_conn, sig_map_q,
+                    ref_out_info, vars_data, vars_q, mods_q, mods_info,
+                    failed_reads_q)
+                failed_reads_q.put((
+                    False, True, None, None, None, sig_info.raw_len))
+                LOGGER.debug('Successfully processed read {}'.format(read_id))
+            except KeyboardInterrupt:
+                failed_reads_q.put((
+                    True, True, 'Keyboard interrupt', fast5_fn, None, 0))
+                LOGGER.debug('Keyboard interrupt during read {}'.format(
+                    read_id))
+                return
+            except mh.MegaError as e:
+                failed_reads_q.put((
+                    True, True, str(e), fast5_fn + ':::' + read_id, None,
+                    sig_info.raw_len))
+                LOGGER.debug('Incomplete processing for read {} ::: {}'.format(
+                    read_id, str(e)))
+            except Exception:
+                failed_reads_q.put((
+                    True, True, _UNEXPECTED_ERROR_CODE,
+                    fast5_fn + ':::' + read_id, traceback.format_exc(), 0))
+                LOGGER.debug('Unexpected error for read {}'.format(read_id))
+
+        if do_exit:
+            if caller_conn is not None:
+                caller_conn.send(True)
+            LOGGER.debug('Gracefully exiting read worker {}'.format(
+                mp.current_process()))
+            break
 
     return
 
@@ -1108,6 +1184,17 @@ def get_parser():
         '--max-concurrent-chunks', type=int, default=200,
         help=hidden_help('Only process N chunks concurrently per-read (to ' +
                          'avoid GPU memory errors). Default: %(default)d'))
+    tai_grp.add_argument(
+        '--max-batch-reads', type=int, default=1,
+        help=hidden_help('Run neural network over chunks from up to N ' +
+                         'queued reads at once. Reads are packed together ' +
+                         'up to --max-concurrent-chunks total chunks. ' +
+                         'Default: %(default)d'))
+    tai_grp.add_argument(
+        '--fp16-transfer', action='store_true',
+        help=hidden_help('Transfer neural network output from GPU to host ' +
+                         'memory at half precision. Halves transfer size, ' +
+                         'but basecalls may differ slightly.'))
     tai_grp.add_argument(
         '--taiyaki-model-filename',
         help=hidden_help('Taiyaki basecalling model checkpoint file.'))
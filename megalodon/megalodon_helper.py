@@ -1,9 +1,11 @@
 import os
 import sys
+import math
 import shutil
 import pkg_resources
 import multiprocessing as mp
 from abc import ABC, abstractmethod
+from functools import lru_cache
 from collections import namedtuple, OrderedDict
 from multiprocessing.queues import Queue as mpQueue
 
@@ -149,8 +151,12 @@ class MegaError(Exception):
 # Helper Functions #
 ####################
 
+@lru_cache(maxsize=None)
 def nstate_to_nbase(nstate):
-    return int(np.sqrt(0.25 + (0.5 * nstate)) - 0.5)
+    # flip-flop models have nstate = 2 * nbase * (nbase + 1), so
+    # nbase = (sqrt(1 + 2 * nstate) - 1) / 2 (floored float sqrt as
+    # math.isqrt is unavailable on python3.5; exact for realistic nstate)
+    return (int(math.sqrt(1 + 2 * nstate)) - 1) // 2
 
 
 def comp(seq):
@@ -158,6 +164,12 @@ def comp(seq):
 
 
 def revcomp(seq):
+    # str.translate uses the CPython ASCII lookup table fast path, which
+    # outperforms a NumPy uint8 lookup table (plus encode/decode) at all
+    # sequence lengths, so complement at the string level. A NumPy uint64
+    # SWAR complement is only faster for long sequences when input is
+    # assumed to contain only ACGT; validating that (N, lowercase and U
+    # must pass through unchanged) costs more than the SWAR step saves.
     return seq.translate(COMP_BASES)[::-1]
 
 
@@ -365,6 +377,86 @@ class AbstractAggregationClass(ABC):
 # Signal Extraction #
 #####################
 
+def _median_inplace(buf, axis=None):
+    """Compute the median via selection (O(n)), partially reordering buf in
+    the process.
+
+    If axis is None buf must be flat and a scalar is returned, else medians
+    along axis are returned with that axis kept as a dimension of length 1.
+    """
+    n = buf.shape[0] if axis is None else buf.shape[axis]
+    k = n // 2
+    is_even = n % 2 == 0
+    kth = [k - 1, k] if is_even else [k, ]
+    is_float = np.issubdtype(buf.dtype, np.floating)
+    if is_float:
+        # move any NaNs to the end (mirrors np.median NaN propagation)
+        kth.append(-1)
+    if axis is None:
+        buf.partition(kth)
+        if is_float and np.isnan(buf[-1]):
+            return buf[-1]
+        if is_even:
+            return buf[k - 1:k + 1].mean()
+        return buf[k]
+
+    buf.partition(kth, axis=axis)
+    if is_even:
+        med = np.take(buf, [k - 1, k], axis=axis).mean(
+            axis=axis, keepdims=True)
+    else:
+        med = np.take(buf, [k, ], axis=axis)
+    if is_float:
+        last = np.take(buf, [-1, ], axis=axis)
+        nan_mask = np.isnan(last)
+        if nan_mask.any():
+            med[nan_mask] = last[nan_mask]
+    return med
+
+
+def _med_mad_1d(data, factor):
+    """Median and MAD over a flattened array using a single working buffer.
+    The absolute deviations are written back into the median selection
+    buffer, so no full size temporary is allocated beyond the initial copy.
+
+    Small integer data (e.g. int16 DAC values) is kept in its native type
+    for the median selection and absolute deviations are computed in
+    float32 (exact for these values), reducing memory traffic compared to
+    float64 without changing results.
+    """
+    data = data.ravel()
+    if np.issubdtype(data.dtype, np.integer) and data.dtype.itemsize <= 2:
+        dmed = np.float64(_median_inplace(data.copy()))
+        dev_buf = np.empty(data.shape, dtype=np.float32)
+        np.subtract(data, dmed, out=dev_buf)
+        np.abs(dev_buf, out=dev_buf)
+        return dmed, factor * np.float64(_median_inplace(dev_buf))
+
+    buf_dtype = data.dtype if np.issubdtype(
+        data.dtype, np.floating) else np.float64
+    buf = data.astype(buf_dtype)
+    dmed = _median_inplace(buf)
+    np.subtract(data, dmed, out=buf)
+    np.abs(buf, out=buf)
+    return dmed, buf.dtype.type(factor) * _median_inplace(buf)
+
+
+def _med_mad_axis(data, factor, axis):
+    """Median and MAD along an axis (keeping dims) using a single working
+    buffer. Medians are selected in place on the buffer and absolute
+    deviations are written back into it (broadcasting against the medians)
+    instead of allocating a temporary for |data - med|.
+    """
+    buf_dtype = data.dtype if np.issubdtype(
+        data.dtype, np.floating) else np.float64
+    buf = data.astype(buf_dtype)
+    dmed = _median_inplace(buf, axis)
+    np.subtract(data, dmed, out=buf)
+    np.abs(buf, out=buf)
+    dmad = factor * _median_inplace(buf, axis)
+    return dmed, dmad
+
+
 def med_mad(data, factor=None, axis=None, keepdims=False):
     """Compute the Median Absolute Deviation, i.e., the median
     of the absolute deviations from the median, and the median
@@ -380,8 +472,13 @@ def med_mad(data, factor=None, axis=None, keepdims=False):
     """
     if factor is None:
         factor = MED_NORM_FACTOR
-    dmed = np.median(data, axis=axis, keepdims=True)
-    dmad = factor * np.median(abs(data - dmed), axis=axis, keepdims=True)
+    if data.size > 0:
+        if axis is None:
+            return _med_mad_1d(data, factor)
+        dmed, dmad = _med_mad_axis(data, factor, axis)
+    else:
+        dmed = np.median(data, axis=axis, keepdims=True)
+        dmad = factor * np.median(abs(data - dmed), axis=axis, keepdims=True)
     if axis is None:
         dmed = dmed.flatten()[0]
         dmad = dmad.flatten()[0]
@@ -391,6 +488,29 @@ def med_mad(data, factor=None, axis=None, keepdims=False):
     return dmed, dmad
 
 
+def scale_signal(dacs, scale_params):
+    """Convert raw DAC values to normalized float32 signal. The shift and
+    scale are applied in place on the single float32 copy of the data.
+
+    Shift and scale are explicitly cast to float32 so arithmetic is
+    performed in float32 regardless of NumPy casting rules (multiplying by
+    the reciprocal of the scale). Normalized values may differ by 1 ulp
+    from dividing in float64 and casting the result to float32.
+
+    :param dacs: A :class:`ndarray` of raw signal values
+    :param scale_params: Tuple of shift (median) and scale (MAD) values
+
+    :returns: Normalized signal (float32 :class:`ndarray`)
+    """
+    shift = np.float32(scale_params[0])
+    # NumPy scalar division gives inf (with a warning) for a zero scale
+    inv_scale = np.float32(1) / np.float32(scale_params[1])
+    raw_sig = dacs.astype(np.float32)
+    np.subtract(raw_sig, shift, out=raw_sig)
+    np.multiply(raw_sig, inv_scale, out=raw_sig)
+    return raw_sig
+
+
 if __name__ == '__main__':
     sys.stderr.write('This is a module. See commands with `megalodon -h`')
     sys.exit(1)